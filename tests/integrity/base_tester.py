@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Shared plumbing for the integrity testing suites
+Provides the ADB connection handling, property and shell helpers and failure handling common to all testers
+"""
+
+import asyncio
+import functools
+import logging
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    from adb_shell.adb_device import AdbDeviceTcp
+except ImportError as e:
+    raise ImportError("adb_shell is required for the integrity tests (pip install adb-shell)") from e
+
+logger = logging.getLogger(__name__)
+
+# One "[key]: [value]" line of `getprop` output
+_GETPROP_LINE_RE = re.compile(r"^\[([^\]]+)\]: \[(.*)\]$", re.MULTILINE)
+
+# Printed between the commands of a session so their outputs can be told apart
+_SESSION_MARKER = "__session_exec_boundary__"
+
+def safe_test(test_name: str):
+    """Turn an exception raised by a test method into the tester's failure result"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            try:
+                return await method(self, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"{test_name} test failed: {e}")
+                return self._failure_result(test_name, str(e), *args, **kwargs)
+        return wrapper
+    return decorator
+
+class BaseTester(ABC):
+    """Common base for ADB-driven integrity testers"""
+    
+    def __init__(self, container_id: str, adb_port: int = 5555):
+        self.container_id = container_id
+        self.adb_port = adb_port
+        self.device = None
+        self.results: List[Any] = []
+        self._prop_cache: Optional[Dict[str, str]] = None
+        self._prop_lock = asyncio.Lock()
+    
+    async def connect_device(self) -> bool:
+        """Connect to Android container via ADB"""
+        try:
+            self.device = AdbDeviceTcp(host='localhost', port=self.adb_port)
+            await self.device.connect()
+            logger.info(f"Connected to container {self.container_id}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to device: {e}")
+            return False
+    
+    async def _stream_lines(self, command: str):
+        """Yield output lines of a shell command as they arrive from the device"""
+        remainder = ""
+        async for chunk in self.device.streaming_shell(command):
+            lines = (remainder + chunk).split("\n")
+            remainder = lines.pop()
+            for line in lines:
+                yield line
+        if remainder:
+            yield remainder
+    
+    async def _stream_contains(self, command: str, needle: str) -> bool:
+        """Check command output for needle, stopping at the first matching line"""
+        async for line in self._stream_lines(command):
+            if needle in line.lower():
+                return True
+        return False
+    
+    async def _props(self, refresh: bool = False) -> Dict[str, str]:
+        """All system properties from a single `getprop` call, cached until refresh is requested"""
+        async with self._prop_lock:
+            if self._prop_cache is None or refresh:
+                output = await self.device.shell("getprop")
+                self._prop_cache = dict(_GETPROP_LINE_RE.findall(output))
+            return self._prop_cache
+    
+    async def _session_exec(self, commands: Sequence[str]) -> List[str]:
+        """Run several shell commands in one round-trip and return each command's output"""
+        script = f"; echo {_SESSION_MARKER}; ".join(f"{{ {command}; }}" for command in commands)
+        output = await self.device.shell(script)
+        return [part.strip("\n") for part in output.split(f"{_SESSION_MARKER}\n", len(commands) - 1)]
+    
+    @abstractmethod
+    def _failure_result(self, test_name: str, error: str, *args, **kwargs):
+        """Build the result recorded when a test raises"""
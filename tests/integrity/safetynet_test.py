@@ -5,22 +5,40 @@ Tests the Android container's ability to pass SafetyNet attestation checks
 """
 
 import asyncio
-import json
 import logging
+import re
 import time
+import orjson
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import adb_shell
 import requests
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
+from base_tester import BaseTester, safe_test
 import base64
+import secrets
 import subprocess
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-@dataclass
+# The test app writes its verdict here (keyed by the --es tag extra) once
+# attestation completes
+RESULT_PATH_TEMPLATE = "/data/local/tmp/sn_{nonce}.json"
+RESULT_POLL_INTERVAL = 0.25
+NONCE_SIZE = 32
+
+# Fields reported by the test app when it falls back to plain-text output
+_SAFETYNET_FIELD_RE = re.compile(
+    r"basicIntegrity:\s*(true|false)"
+    r"|ctsProfileMatch:\s*(true|false)"
+    r"|evaluationType:\s*(\w+)"
+    r"|advice:[ \t]*([^\n]*)",
+    re.IGNORECASE
+)
+
+@dataclass(slots=True, frozen=True)
 class SafetyNetResult:
     device_id: str
     test_type: str
@@ -33,38 +51,69 @@ class SafetyNetResult:
     error: Optional[str] = None
     raw_response: Optional[str] = None
 
-class SafetyNetTester:
+class SafetyNetTester(BaseTester):
     """Comprehensive SafetyNet API testing framework"""
     
-    def __init__(self, container_id: str, adb_port: int = 5555):
-        self.container_id = container_id
-        self.adb_port = adb_port
-        self.device = None
-        self.results: List[SafetyNetResult] = []
-        
-    async def connect_device(self) -> bool:
-        """Connect to Android container via ADB"""
-        try:
-            from adb_shell.adb_device import AdbDeviceTcp
-            self.device = AdbDeviceTcp(host='localhost', port=self.adb_port)
-            await self.device.connect()
-            logger.info(f"Connected to container {self.container_id}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to device: {e}")
-            return False
+    def _failure_result(self, test_type: str, error: str, nonce: str) -> SafetyNetResult:
+        """Result recorded when an integrity test raises"""
+        return SafetyNetResult(
+            device_id=self.container_id,
+            test_type=test_type,
+            basic_integrity=False,
+            cts_profile_match=False,
+            evaluation_type="ERROR",
+            nonce=nonce,
+            timestamp=datetime.now(),
+            advice="",
+            error=error
+        )
     
     def generate_nonce(self) -> str:
         """Generate cryptographically secure nonce for SafetyNet request"""
-        import secrets
-        return base64.b64encode(secrets.token_bytes(32)).decode()
+        return self.generate_nonces(1)[0]
+    
+    def generate_nonces(self, count: int) -> List[str]:
+        """Generate several nonces from a single random draw"""
+        blob = memoryview(secrets.token_bytes(NONCE_SIZE * count))
+        # URL-safe alphabet so the nonce can be embedded in the result file name
+        return [
+            base64.urlsafe_b64encode(blob[i:i + NONCE_SIZE]).decode()
+            for i in range(0, NONCE_SIZE * count, NONCE_SIZE)
+        ]
+    
+    async def _fetch_result(self, nonce: str, timeout: float) -> str:
+        """Poll for the test app's result file and return its contents
+        
+        The file is removed once read. Falls back to the RESULT broadcast if
+        the app never writes it within the timeout.
+        """
+        result_path = RESULT_PATH_TEMPLATE.format(nonce=nonce)
+        for _ in range(int(timeout / RESULT_POLL_INTERVAL)):
+            output = await self.device.shell(f"cat {result_path} 2>/dev/null && rm -f {result_path}")
+            if output.strip():
+                return output
+            await asyncio.sleep(RESULT_POLL_INTERVAL)
+        
+        logger.warning(f"No SafetyNet result file after {timeout}s for nonce {nonce}, querying broadcast")
+        return await self.device.shell(f"am broadcast -a com.safetynettest.RESULT --es tag {nonce}")
     
     async def install_safetynet_test_app(self) -> bool:
         """Install custom SafetyNet testing application"""
         try:
-            # Install the test APK
             apk_path = "/opt/testing/safetynet-tester.apk"
-            result = await self.device.shell(f"pm install {apk_path}")
+            
+            # Skip the (slow) install when the same APK is already installed
+            installed = (await self.device.shell("pm path com.safetynettest")).strip()
+            if installed.startswith("package:"):
+                installed_apk = installed.splitlines()[0][len("package:"):]
+                checksums = await self.device.shell(f"md5sum {apk_path} {installed_apk} 2>/dev/null")
+                digests = [line.split()[0] for line in checksums.splitlines() if line.strip()]
+                if len(digests) == 2 and digests[0] == digests[1]:
+                    logger.info("SafetyNet test app already installed")
+                    return True
+            
+            # Install (or replace) the test APK
+            result = await self.device.shell(f"pm install -r {apk_path}")
             if "Success" in result:
                 logger.info("SafetyNet test app installed successfully")
                 return True
@@ -75,165 +124,123 @@ class SafetyNetTester:
             logger.error(f"Error installing test app: {e}")
             return False
     
+    @safe_test("basic_integrity")
     async def test_basic_integrity(self, nonce: str) -> SafetyNetResult:
         """Test basic SafetyNet integrity"""
         logger.info("Testing SafetyNet Basic Integrity")
         
-        try:
-            # Launch SafetyNet test with basic integrity check
-            cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type basic"
-            await self.device.shell(cmd)
-            
-            # Wait for result
-            await asyncio.sleep(10)
-            
-            # Get result from test app
-            result_cmd = "am broadcast -a com.safetynettest.RESULT"
-            output = await self.device.shell(result_cmd)
-            
-            # Parse result
-            result_data = self._parse_safetynet_result(output)
-            
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="basic_integrity",
-                basic_integrity=result_data.get('basicIntegrity', False),
-                cts_profile_match=result_data.get('ctsProfileMatch', False),
-                evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice=result_data.get('advice', ''),
-                raw_response=output
-            )
-            
-        except Exception as e:
-            logger.error(f"Basic integrity test failed: {e}")
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="basic_integrity",
-                basic_integrity=False,
-                cts_profile_match=False,
-                evaluation_type="ERROR",
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice="",
-                error=str(e)
-            )
+        # Launch SafetyNet test with basic integrity check
+        cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type basic --es tag {nonce}"
+        await self.device.shell(cmd)
+        
+        # Wait for result from test app
+        output = await self._fetch_result(nonce, timeout=10)
+        
+        # Parse result
+        result_data = self._parse_safetynet_result(output)
+        
+        return SafetyNetResult(
+            device_id=self.container_id,
+            test_type="basic_integrity",
+            basic_integrity=result_data.get('basicIntegrity', False),
+            cts_profile_match=result_data.get('ctsProfileMatch', False),
+            evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
+            nonce=nonce,
+            timestamp=datetime.now(),
+            advice=result_data.get('advice', ''),
+            raw_response=output
+        )
     
+    @safe_test("device_integrity")
     async def test_device_integrity(self, nonce: str) -> SafetyNetResult:
         """Test SafetyNet device integrity (hardware attestation)"""
         logger.info("Testing SafetyNet Device Integrity")
         
-        try:
-            # Test with hardware attestation
-            cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type device"
-            await self.device.shell(cmd)
-            
-            await asyncio.sleep(15)  # Device integrity takes longer
-            
-            result_cmd = "am broadcast -a com.safetynettest.RESULT"
-            output = await self.device.shell(result_cmd)
-            
-            result_data = self._parse_safetynet_result(output)
-            
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="device_integrity",
-                basic_integrity=result_data.get('basicIntegrity', False),
-                cts_profile_match=result_data.get('ctsProfileMatch', False),
-                evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice=result_data.get('advice', ''),
-                raw_response=output
-            )
-            
-        except Exception as e:
-            logger.error(f"Device integrity test failed: {e}")
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="device_integrity",
-                basic_integrity=False,
-                cts_profile_match=False,
-                evaluation_type="ERROR",
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice="",
-                error=str(e)
-            )
+        # Test with hardware attestation
+        cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type device --es tag {nonce}"
+        await self.device.shell(cmd)
+        
+        output = await self._fetch_result(nonce, timeout=15)  # Device integrity takes longer
+        
+        result_data = self._parse_safetynet_result(output)
+        
+        return SafetyNetResult(
+            device_id=self.container_id,
+            test_type="device_integrity",
+            basic_integrity=result_data.get('basicIntegrity', False),
+            cts_profile_match=result_data.get('ctsProfileMatch', False),
+            evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
+            nonce=nonce,
+            timestamp=datetime.now(),
+            advice=result_data.get('advice', ''),
+            raw_response=output
+        )
     
+    @safe_test("strong_integrity")
     async def test_strong_integrity(self, nonce: str) -> SafetyNetResult:
         """Test SafetyNet strong integrity with additional checks"""
         logger.info("Testing SafetyNet Strong Integrity")
         
-        try:
-            # Enable additional security features
-            await self.device.shell("setprop security.perf_harden 1")
-            await self.device.shell("setprop ro.boot.verifyboot green")
-            await self.device.shell("setprop ro.boot.flash.locked 1")
-            
-            cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type strong"
-            await self.device.shell(cmd)
-            
-            await asyncio.sleep(20)  # Strong integrity takes the longest
-            
-            result_cmd = "am broadcast -a com.safetynettest.RESULT"
-            output = await self.device.shell(result_cmd)
-            
-            result_data = self._parse_safetynet_result(output)
-            
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="strong_integrity",
-                basic_integrity=result_data.get('basicIntegrity', False),
-                cts_profile_match=result_data.get('ctsProfileMatch', False),
-                evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice=result_data.get('advice', ''),
-                raw_response=output
-            )
-            
-        except Exception as e:
-            logger.error(f"Strong integrity test failed: {e}")
-            return SafetyNetResult(
-                device_id=self.container_id,
-                test_type="strong_integrity",
-                basic_integrity=False,
-                cts_profile_match=False,
-                evaluation_type="ERROR",
-                nonce=nonce,
-                timestamp=datetime.now(),
-                advice="",
-                error=str(e)
-            )
+        # Enable additional security features in one shell round-trip
+        await self.device.shell(
+            "setprop security.perf_harden 1; "
+            "setprop ro.boot.verifyboot green; "
+            "setprop ro.boot.flash.locked 1"
+        )
+        
+        cmd = f"am start -n com.safetynettest/MainActivity --es nonce {nonce} --es type strong --es tag {nonce}"
+        await self.device.shell(cmd)
+        
+        output = await self._fetch_result(nonce, timeout=20)  # Strong integrity takes the longest
+        
+        result_data = self._parse_safetynet_result(output)
+        
+        return SafetyNetResult(
+            device_id=self.container_id,
+            test_type="strong_integrity",
+            basic_integrity=result_data.get('basicIntegrity', False),
+            cts_profile_match=result_data.get('ctsProfileMatch', False),
+            evaluation_type=result_data.get('evaluationType', 'UNKNOWN'),
+            nonce=nonce,
+            timestamp=datetime.now(),
+            advice=result_data.get('advice', ''),
+            raw_response=output
+        )
     
     def _parse_safetynet_result(self, output: str) -> Dict:
         """Parse SafetyNet API response"""
-        try:
-            # Extract JSON from broadcast result
-            start_idx = output.find('{')
-            end_idx = output.rfind('}') + 1
-            if start_idx != -1 and end_idx != -1:
-                json_str = output[start_idx:end_idx]
-                return json.loads(json_str)
-        except Exception as e:
-            logger.error(f"Failed to parse SafetyNet result: {e}")
+        # Extract JSON from broadcast result
+        start_idx = output.find('{')
+        end_idx = output.rfind('}') + 1
+        if start_idx != -1 and end_idx > start_idx:
+            try:
+                return orjson.loads(output[start_idx:end_idx])
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Failed to parse SafetyNet result: {e}")
         
-        # Fallback parsing for non-JSON output
+        # Fallback parsing for non-JSON output, folded from a single regex scan
         result = {
-            'basicIntegrity': 'basicIntegrity: true' in output.lower(),
-            'ctsProfileMatch': 'ctsprofilematch: true' in output.lower(),
-            'evaluationType': 'BASIC' if 'basic' in output.lower() else 'UNKNOWN',
+            'basicIntegrity': False,
+            'ctsProfileMatch': False,
+            'evaluationType': 'UNKNOWN',
             'advice': ''
         }
         
-        if 'advice:' in output.lower():
-            advice_start = output.lower().find('advice:') + 7
-            advice_end = output.find('\n', advice_start)
-            if advice_end == -1:
-                advice_end = len(output)
-            result['advice'] = output[advice_start:advice_end].strip()
+        evaluation_type = None
+        for match in _SAFETYNET_FIELD_RE.finditer(output):
+            basic, cts, evaluation, advice = match.groups()
+            if basic is not None:
+                result['basicIntegrity'] = basic.lower() == 'true'
+                result['evaluationType'] = 'BASIC'
+            elif cts is not None:
+                result['ctsProfileMatch'] = cts.lower() == 'true'
+            elif evaluation is not None:
+                evaluation_type = evaluation.upper()
+            elif not result['advice']:
+                result['advice'] = advice.strip()
+        
+        if evaluation_type:
+            result['evaluationType'] = evaluation_type
         
         return result
     
@@ -248,18 +255,18 @@ class SafetyNetTester:
             return []
         
         # Generate unique nonces for each test
-        nonces = [self.generate_nonce() for _ in range(3)]
+        nonces = self.generate_nonces(3)
         
-        # Run all tests
-        basic_result = await self.test_basic_integrity(nonces[0])
-        self.results.append(basic_result)
-        
-        device_result = await self.test_device_integrity(nonces[1])
-        self.results.append(device_result)
-        
-        strong_result = await self.test_strong_integrity(nonces[2])
-        self.results.append(strong_result)
+        # Run the basic and device tests concurrently; each run is tagged with its
+        # nonce so the RESULT broadcasts of overlapping runs don't collide
+        self.results = list(await asyncio.gather(
+            self.test_basic_integrity(nonces[0]),
+            self.test_device_integrity(nonces[1])
+        ))
         
+        # The strong test sets device-wide hardening props, so it runs only after
+        # the other two have finished and they never see those props
+        self.results.append(await self.test_strong_integrity(nonces[2]))
         return self.results
     
     def generate_report(self) -> Dict:
@@ -272,25 +279,14 @@ class SafetyNetTester:
         
         report = {
             "container_id": self.container_id,
-            "test_timestamp": datetime.now().isoformat(),
+            "test_timestamp": datetime.now(),
             "total_tests": total_tests,
             "passed_tests": passed_tests,
             "success_rate": (passed_tests / total_tests) * 100,
             "overall_status": "PASS" if passed_tests == total_tests else "FAIL",
-            "test_results": []
+            "test_results": [asdict(result) for result in self.results]
         }
         
-        for result in self.results:
-            report["test_results"].append({
-                "test_type": result.test_type,
-                "basic_integrity": result.basic_integrity,
-                "cts_profile_match": result.cts_profile_match,
-                "evaluation_type": result.evaluation_type,
-                "timestamp": result.timestamp.isoformat(),
-                "advice": result.advice,
-                "error": result.error
-            })
-        
         return report
 
 async def main():
@@ -307,11 +303,14 @@ async def main():
     results = await tester.run_comprehensive_test()
     report = tester.generate_report()
     
-    print(json.dumps(report, indent=2))
+    # Serialize once and reuse the bytes for stdout and the report file
+    payload = orjson.dumps(report, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE)
+    sys.stdout.buffer.write(payload)
+    sys.stdout.flush()
     
     # Save report to file
-    with open(f"/tmp/safetynet_report_{container_id}_{int(time.time())}.json", 'w') as f:
-        json.dump(report, f, indent=2)
+    with open(f"/tmp/safetynet_report_{container_id}_{int(time.time())}.json", 'wb') as f:
+        f.write(payload)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
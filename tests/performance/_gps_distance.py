@@ -0,0 +1,25 @@
+"""
+Scalar distance kernel shared by the JIT kernels in gps_accuracy_test.py and the
+ahead-of-time build in _gps_math_aot.py; each compiles it with its own Numba options
+"""
+
+import math
+
+EARTH_RADIUS_M = 6371000
+
+def haversine(lat1, lon1, alt1, lat2, lon2, alt2):
+    """Haversine distance in meters between two points, altitude-corrected"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    dlat = lat2_rad - lat1_rad
+    dlon = math.radians(lon2) - math.radians(lon1)
+    
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
+    distance = EARTH_RADIUS_M * 2 * math.asin(math.sqrt(a))
+    
+    # Add altitude difference if significant
+    altitude_diff = abs(alt2 - alt1)
+    if altitude_diff > 1.0:
+        distance = math.sqrt(distance ** 2 + altitude_diff ** 2)
+    
+    return distance
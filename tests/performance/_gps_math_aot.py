@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Ahead-of-time build of the GPS distance kernels
+Run once per environment to produce the _gps_math extension next to gps_accuracy_test.py:
+
+    python tests/performance/_gps_math_aot.py
+"""
+
+import os
+
+from numba import njit
+from numba.pycc import CC
+
+from _gps_distance import haversine
+
+cc = CC('_gps_math')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+_hav = njit(fastmath=True)(haversine)
+
+@cc.export('path_length', 'f8(f8[:, :])')
+def path_length(points):
+    """Total length in meters of the path through the rows of an (N, 3) array"""
+    total = 0.0
+    for i in range(points.shape[0] - 1):
+        total += _hav(points[i, 0], points[i, 1], points[i, 2],
+                      points[i + 1, 0], points[i + 1, 1], points[i + 1, 2])
+    return total
+
+@cc.export('max_deviation', 'f8(f8[:, :], f8[:, :], i8)')
+def max_deviation(expected, actual, n):
+    """Largest distance in meters between the first n rows of two (N, 3) arrays"""
+    deviation = 0.0
+    for i in range(n):
+        d = _hav(expected[i, 0], expected[i, 1], expected[i, 2],
+                 actual[i, 0], actual[i, 1], actual[i, 2])
+        if d > deviation:
+            deviation = d
+    return deviation
+
+if __name__ == "__main__":
+    cc.compile()
@@ -5,25 +5,166 @@ Tests GPS location spoofing accuracy and performance
 """
 
 import asyncio
-import json
 import logging
 import time
 import math
+import re
+import functools
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, NamedTuple
-import subprocess
-import requests
+from typing import Dict, List, Optional, Tuple
+import shlex
+import numpy as np
+import orjson
 from dataclasses import dataclass
+from _gps_distance import EARTH_RADIUS_M, haversine
+
+# Kernels precompiled by _gps_math_aot.py; when present Numba is never imported,
+# so short-lived runs skip the JIT warm-up entirely
+try:
+    import _gps_math
+except ImportError:
+    _gps_math = None
+
+HAVE_NUMBA = False
+prange = range
+
+def njit(*args, **kwargs):
+    """Stand-in for numba.njit that leaves the function as plain Python"""
+    return lambda func: func
+
+if _gps_math is None:
+    try:
+        from numba import njit, prange
+        HAVE_NUMBA = True
+    except ImportError:
+        pass
+
+# Location fix in `dumpsys location` style output, either as labelled
+# latitude/longitude/altitude fields or as Location[gps LAT,LON ... alt=ALT]
+_LOCATION_RE = re.compile(
+    rb"latitude[=:\s]+(-?\d+(?:\.\d+)?).*?longitude[=:\s]+(-?\d+(?:\.\d+)?)"
+    rb"(?:.*?altitude[=:\s]+(-?\d+(?:\.\d+)?))?"
+    rb"|Location\[\w+ (-?\d+(?:\.\d+)?),(-?\d+(?:\.\d+)?)(?:[^\]]*?\balt=(-?\d+(?:\.\d+)?))?",
+    re.IGNORECASE | re.DOTALL
+)
+
+# Static location tests allowed in flight at once
+STATIC_TEST_CONCURRENCY = 3
+
+# Beyond this separation the cheap-ruler approximation drifts, so exact Haversine is used instead
+RULER_MAX_DISTANCE_M = 20000
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class GeoPoint(NamedTuple):
+def _haversine_np(lat1, lon1, alt1, lat2, lon2, alt2) -> np.ndarray:
+    """Vectorized Haversine distance in meters between arrays of points"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    distance = EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(a))
+    
+    # Add altitude difference if significant
+    altitude_diff = np.abs(np.asarray(alt2, dtype=np.float64) - np.asarray(alt1, dtype=np.float64))
+    return np.where(altitude_diff > 1.0, np.hypot(distance, altitude_diff), distance)
+
+_hav_nb = njit('f8(f8,f8,f8,f8,f8,f8)', fastmath=True, cache=True)(haversine)
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _hav_nb_arr(points):
+    """Total length in meters of the path through the rows of an (N, 3) array"""
+    total = 0.0
+    for i in prange(points.shape[0] - 1):
+        total += _hav_nb(points[i, 0], points[i, 1], points[i, 2],
+                         points[i + 1, 0], points[i + 1, 1], points[i + 1, 2])
+    return total
+
+@njit(parallel=True, fastmath=True, cache=True)
+def _max_dev_nb(expected, actual, n):
+    """Largest distance in meters between the first n rows of two (N, 3) arrays"""
+    deviations = np.empty(n)
+    for i in prange(n):
+        deviations[i] = _hav_nb(expected[i, 0], expected[i, 1], expected[i, 2],
+                                actual[i, 0], actual[i, 1], actual[i, 2])
+    return deviations.max()
+
+def _path_length(points: np.ndarray) -> float:
+    """Total length in meters of an (N, 3) path, using a compiled kernel when available"""
+    if _gps_math is not None:
+        return _gps_math.path_length(points)
+    if HAVE_NUMBA:
+        return _hav_nb_arr(points)
+    return float(_segment_distances(points).sum())
+
+def _max_deviation(expected: np.ndarray, actual: np.ndarray) -> float:
+    """Largest pointwise distance between expected and reported paths, 0.0 if either is empty"""
+    compared = min(len(expected), len(actual))
+    if not compared:
+        return 0.0
+    if _gps_math is not None:
+        return _gps_math.max_deviation(expected, actual, compared)
+    if HAVE_NUMBA:
+        return _max_dev_nb(expected, actual, compared)
+    return float(_haversine_np(expected[:compared, 0], expected[:compared, 1], expected[:compared, 2],
+                               actual[:compared, 0], actual[:compared, 1], actual[:compared, 2]).max())
+
+@functools.lru_cache(maxsize=1024)
+def _ruler_factors(lat_bucket: float) -> Tuple[float, float]:
+    """Meters per degree of longitude and latitude (FCC series) at a latitude bucket"""
+    lat = math.radians(lat_bucket)
+    kx = 111.41513 * math.cos(lat) - 0.09455 * math.cos(3 * lat) + 0.00012 * math.cos(5 * lat)
+    ky = 111.13209 - 0.56605 * math.cos(2 * lat) + 0.0012 * math.cos(4 * lat)
+    return kx * 1000, ky * 1000
+
+def _ruler_distance(lat1, lon1, alt1, lat2, lon2, alt2) -> float:
+    """Cheap-ruler (FCC) distance in meters, exact Haversine beyond RULER_MAX_DISTANCE_M"""
+    kx, ky = _ruler_factors(round((lat1 + lat2) / 2, 1))
+    return _scaled_distance(kx, ky, lat1, lon1, alt1, lat2, lon2, alt2)
+
+def _scaled_distance(kx, ky, lat1, lon1, alt1, lat2, lon2, alt2) -> float:
+    """Planar distance in meters given meters/degree factors for the area of the two points
+    
+    Separations beyond RULER_MAX_DISTANCE_M, such as fixes far from the expected point,
+    fall back to exact Haversine so large errors are reported accurately
+    """
+    dlon = (lon2 - lon1 + 180.0) % 360.0 - 180.0
+    distance = math.hypot(kx * dlon, ky * (lat2 - lat1))
+    if distance > RULER_MAX_DISTANCE_M:
+        return haversine(lat1, lon1, alt1, lat2, lon2, alt2)
+    
+    # Add altitude difference if significant
+    altitude_diff = abs(alt2 - alt1)
+    if altitude_diff > 1.0:
+        distance = math.hypot(distance, altitude_diff)
+    
+    return distance
+
+def _points_to_array(points) -> np.ndarray:
+    """Pack GeoPoints into an (N, 3) array of latitude, longitude, altitude"""
+    return np.array([(p.latitude, p.longitude, p.altitude) for p in points], dtype=np.float64).reshape(-1, 3)
+
+def _row_to_geopoint(row: np.ndarray) -> "GeoPoint":
+    """View a (latitude, longitude, altitude) row as a GeoPoint for ADB injection"""
+    return GeoPoint(float(row[0]), float(row[1]), float(row[2]))
+
+def _segment_distances(points: np.ndarray) -> np.ndarray:
+    """Distances between consecutive rows of an (N, 3) point array"""
+    return _haversine_np(points[:-1, 0], points[:-1, 1], points[:-1, 2],
+                         points[1:, 0], points[1:, 1], points[1:, 2])
+
+@dataclass(frozen=True, slots=True)
+class GeoPoint:
     latitude: float
     longitude: float
     altitude: float = 0.0
     accuracy: float = 5.0
 
+def _json_default(obj):
+    """orjson fallback for report values it cannot encode natively"""
+    if isinstance(obj, GeoPoint):
+        return {"latitude": obj.latitude, "longitude": obj.longitude, "altitude": obj.altitude}
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
 @dataclass
 class GPSTestResult:
     container_id: str
@@ -42,8 +183,8 @@ class GPSTestResult:
 class MovementTestResult:
     container_id: str
     path_name: str
-    waypoints: List[GeoPoint]
-    actual_path: List[GeoPoint]
+    waypoints: np.ndarray  # (N, 3) latitude, longitude, altitude
+    actual_path: np.ndarray
     total_distance_expected_m: float
     total_distance_actual_m: float
     average_speed_kmh: float
@@ -61,6 +202,7 @@ class GPSAccuracyTester:
         self.adb_port = adb_port
         self.results: List[GPSTestResult] = []
         self.movement_results: List[MovementTestResult] = []
+        self._location_lock = asyncio.Lock()
         
         # Test locations around the world for accuracy testing
         self.test_locations = {
@@ -100,77 +242,89 @@ class GPSAccuracyTester:
                 GeoPoint(35.6284, 139.7387, 30.0),  # Roppongi
             ]
         }
-    
-    def calculate_distance(self, point1: GeoPoint, point2: GeoPoint) -> float:
-        """Calculate distance between two GPS points in meters using Haversine formula"""
-        
-        # Convert latitude and longitude from degrees to radians
-        lat1_rad = math.radians(point1.latitude)
-        lon1_rad = math.radians(point1.longitude)
-        lat2_rad = math.radians(point2.latitude)
-        lon2_rad = math.radians(point2.longitude)
         
-        # Haversine formula
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        
-        a = (math.sin(dlat/2)**2 + 
-             math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2)
-        c = 2 * math.asin(math.sqrt(a))
-        
-        # Radius of Earth in meters
-        r = 6371000
+        # Ruler factors at each reference location, so error measurements skip the factor lookup
+        self._test_location_rulers = {
+            name: _ruler_factors(round(location.latitude, 1))
+            for name, location in self.test_locations.items()
+        }
         
-        # Calculate the distance
-        distance = r * c
+        # Paths packed as contiguous (N, 3) arrays for the vectorized distance kernels
+        self._test_paths_np = {
+            name: _points_to_array(waypoints)
+            for name, waypoints in self.test_paths.items()
+        }
         
-        # Add altitude difference if significant
-        altitude_diff = abs(point2.altitude - point1.altitude)
-        if altitude_diff > 1.0:
-            distance = math.sqrt(distance**2 + altitude_diff**2)
+        # Path geometry is fixed, so segment and total distances are computed once
+        self._path_geometry = {
+            name: self._compute_path_geometry(waypoints)
+            for name, waypoints in self._test_paths_np.items()
+        }
+    
+    @staticmethod
+    def _compute_path_geometry(waypoints: np.ndarray) -> Tuple[float, np.ndarray]:
+        """Expected total distance and per-segment distances of a waypoint path"""
+        segment_distances = _segment_distances(waypoints)
+        return float(segment_distances.sum()), segment_distances
+    
+    def calculate_distance(self, point1: GeoPoint, point2: GeoPoint) -> float:
+        """Calculate distance between two GPS points in meters using the cheap-ruler approximation"""
+        return _ruler_distance(point1.latitude, point1.longitude, point1.altitude,
+                               point2.latitude, point2.longitude, point2.altitude)
+    
+    def _distance_to_named(self, location_name: str, other: GeoPoint) -> float:
+        """Distance in meters from a built-in test location using its precomputed ruler factors"""
+        location = self.test_locations[location_name]
+        kx, ky = self._test_location_rulers[location_name]
+        return _scaled_distance(kx, ky, location.latitude, location.longitude, location.altitude,
+                                other.latitude, other.longitude, other.altitude)
+    
+    async def _adb(self, *args: str, timeout: float = 10) -> Tuple[int, bytes, bytes]:
+        """Run an adb command against the container without blocking the event loop
+        
+        Output is returned as raw bytes; callers decode only what they actually parse
+        """
+        proc = await asyncio.create_subprocess_exec(
+            'adb', '-s', f'localhost:{self.adb_port}', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
         
-        return distance
+        return proc.returncode, stdout, stderr
     
     async def inject_gps_location(self, location: GeoPoint) -> bool:
         """Inject GPS location into Android container"""
         try:
-            # Use ADB to inject location
-            cmd = [
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'am', 'broadcast',
-                '-a', 'android.location.GPS_ENABLED_CHANGE',
-                '--ez', 'enabled', 'true'
-            ]
-            subprocess.run(cmd, capture_output=True, timeout=5)
-            
-            # Set mock location
-            location_cmd = [
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'am', 'broadcast',
-                '-a', 'android.location.providers.gps.SET_LOCATION',
-                '--ef', 'latitude', str(location.latitude),
-                '--ef', 'longitude', str(location.longitude),
-                '--ef', 'altitude', str(location.altitude),
-                '--ef', 'accuracy', str(location.accuracy)
+            # Enable GPS, set the mock location and also try the location
+            # service directly, all in a single adb shell invocation
+            commands = [
+                ['am', 'broadcast',
+                 '-a', 'android.location.GPS_ENABLED_CHANGE',
+                 '--ez', 'enabled', 'true'],
+                ['am', 'broadcast',
+                 '-a', 'android.location.providers.gps.SET_LOCATION',
+                 '--ef', 'latitude', str(location.latitude),
+                 '--ef', 'longitude', str(location.longitude),
+                 '--ef', 'altitude', str(location.altitude),
+                 '--ef', 'accuracy', str(location.accuracy)],
+                ['service', 'call', 'location', '49',
+                 'i32', '0',  # provider ID
+                 'd', str(location.latitude),
+                 'd', str(location.longitude),
+                 'f', str(location.altitude),
+                 'f', str(location.accuracy),
+                 'i64', str(int(time.time() * 1000))]  # timestamp
             ]
             
-            result = subprocess.run(location_cmd, capture_output=True, text=True, timeout=10)
-            
-            # Also try using location service directly
-            location_service_cmd = [
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'service', 'call', 'location', '49',
-                'i32', '0',  # provider ID
-                'd', str(location.latitude),
-                'd', str(location.longitude), 
-                'f', str(location.altitude),
-                'f', str(location.accuracy),
-                'i64', str(int(time.time() * 1000))  # timestamp
-            ]
+            _, _, stderr = await self._adb('shell', '; '.join(shlex.join(command) for command in commands))
             
-            subprocess.run(location_service_cmd, capture_output=True, timeout=10)
-            
-            return "error" not in result.stderr.lower()
+            return b"error" not in stderr.lower()
             
         except Exception as e:
             logger.error(f"Failed to inject GPS location: {e}")
@@ -182,55 +336,28 @@ class GPSAccuracyTester:
             # Try multiple methods to get location
             methods = [
                 # Method 1: Using location service
-                [
-                    'adb', '-s', f'localhost:{self.adb_port}',
-                    'shell', 'dumpsys', 'location'
-                ],
+                ['shell', 'dumpsys', 'location'],
                 # Method 2: Using location manager
-                [
-                    'adb', '-s', f'localhost:{self.adb_port}',
-                    'shell', 'service', 'call', 'location', '1'
-                ]
+                ['shell', 'service', 'call', 'location', '1']
             ]
             
             for method in methods:
                 try:
-                    result = subprocess.run(method, capture_output=True, text=True, timeout=10)
-                    
-                    # Parse location from output
-                    if "latitude" in result.stdout.lower() and "longitude" in result.stdout.lower():
-                        lines = result.stdout.split('\n')
-                        lat, lon, alt = None, None, 0.0
-                        
-                        for line in lines:
-                            if 'latitude' in line.lower():
-                                try:
-                                    lat = float(line.split()[-1])
-                                except:
-                                    pass
-                            elif 'longitude' in line.lower():
-                                try:
-                                    lon = float(line.split()[-1])
-                                except:
-                                    pass
-                            elif 'altitude' in line.lower():
-                                try:
-                                    alt = float(line.split()[-1])
-                                except:
-                                    pass
-                        
-                        if lat is not None and lon is not None:
-                            return GeoPoint(lat, lon, alt, 5.0)
-                
-                except:
+                    _, stdout, _ = await self._adb(*method)
+                except (OSError, asyncio.TimeoutError) as e:
+                    logger.warning(f"Location query {' '.join(method[1:])} failed: {e}")
                     continue
+                
+                # Parse location from output in a single scan
+                match = _LOCATION_RE.search(stdout)
+                if match:
+                    groups = match.groups()
+                    lat, lon, alt = groups[:3] if groups[0] is not None else groups[3:]
+                    return GeoPoint(float(lat), float(lon), float(alt or 0.0), 5.0)
             
             # Fallback method: Try to read from location test app
-            app_result = subprocess.run([
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'am', 'broadcast',
-                '-a', 'com.locationtest.GET_CURRENT_LOCATION'
-            ], capture_output=True, text=True, timeout=10)
+            await self._adb('shell', 'am', 'broadcast',
+                            '-a', 'com.locationtest.GET_CURRENT_LOCATION')
             
             # This would need a custom location test app to respond
             return None
@@ -243,12 +370,9 @@ class GPSAccuracyTester:
         """Install GPS testing application"""
         try:
             apk_path = "/opt/testing/gps-tester.apk"
-            result = subprocess.run([
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'install', apk_path
-            ], capture_output=True, text=True, timeout=60)
+            _, stdout, _ = await self._adb('install', apk_path, timeout=60)
             
-            if "Success" in result.stdout:
+            if b"Success" in stdout:
                 # Grant location permissions
                 permissions = [
                     "android.permission.ACCESS_FINE_LOCATION",
@@ -257,10 +381,7 @@ class GPSAccuracyTester:
                 ]
                 
                 for permission in permissions:
-                    subprocess.run([
-                        'adb', '-s', f'localhost:{self.adb_port}',
-                        'shell', 'pm', 'grant', 'com.gpstest', permission
-                    ], capture_output=True, timeout=5)
+                    await self._adb('shell', 'pm', 'grant', 'com.gpstest', permission, timeout=5)
                 
                 logger.info("GPS test app installed successfully")
                 return True
@@ -276,33 +397,36 @@ class GPSAccuracyTester:
         """Test GPS injection accuracy for a single location"""
         logger.info(f"Testing GPS accuracy for {location_name}")
         
-        start_time = time.time()
-        
-        # Inject the location
-        injection_success = await self.inject_gps_location(location)
-        
-        if not injection_success:
-            return GPSTestResult(
-                container_id=self.container_id,
-                test_name=f"GPS Accuracy - {location_name}",
-                expected_location=location,
-                actual_location=None,
-                distance_error_meters=float('inf'),
-                accuracy_percentage=0.0,
-                response_time_ms=(time.time() - start_time) * 1000,
-                injection_success=False,
-                app_detection_success=False,
-                timestamp=datetime.now(),
-                error="GPS injection failed"
-            )
-        
-        # Wait for location to be set
-        await asyncio.sleep(3)
-        
-        # Get the current location
-        actual_location = await self.get_current_location()
-        
-        response_time_ms = (time.time() - start_time) * 1000
+        # The container has a single GPS fix, so concurrent tests take turns
+        # between injecting a location and reading it back
+        async with self._location_lock:
+            start_ns = time.monotonic_ns()
+            
+            # Inject the location
+            injection_success = await self.inject_gps_location(location)
+            
+            if not injection_success:
+                return GPSTestResult(
+                    container_id=self.container_id,
+                    test_name=f"GPS Accuracy - {location_name}",
+                    expected_location=location,
+                    actual_location=None,
+                    distance_error_meters=float('inf'),
+                    accuracy_percentage=0.0,
+                    response_time_ms=(time.monotonic_ns() - start_ns) / 1_000_000,
+                    injection_success=False,
+                    app_detection_success=False,
+                    timestamp=datetime.now(),
+                    error="GPS injection failed"
+                )
+            
+            # Wait for location to be set
+            await asyncio.sleep(3)
+            
+            # Get the current location
+            actual_location = await self.get_current_location()
+            
+            response_time_ms = (time.monotonic_ns() - start_ns) / 1_000_000
         
         if actual_location is None:
             return GPSTestResult(
@@ -320,7 +444,10 @@ class GPSAccuracyTester:
             )
         
         # Calculate accuracy
-        distance_error = self.calculate_distance(location, actual_location)
+        if location is self.test_locations.get(location_name):
+            distance_error = self._distance_to_named(location_name, actual_location)
+        else:
+            distance_error = self.calculate_distance(location, actual_location)
         
         # Accuracy percentage (inverse of error, with expected accuracy as baseline)
         expected_accuracy_m = location.accuracy
@@ -346,51 +473,48 @@ class GPSAccuracyTester:
         """Test if apps can successfully detect the injected location"""
         try:
             # Launch a location-aware app (like Maps or a location test app)
-            subprocess.run([
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'am', 'start',
-                '-a', 'android.intent.action.VIEW',
-                '-d', f'geo:{location.latitude},{location.longitude}'
-            ], capture_output=True, timeout=10)
+            await self._adb('shell', 'am', 'start',
+                            '-a', 'android.intent.action.VIEW',
+                            '-d', f'geo:{location.latitude},{location.longitude}')
             
             await asyncio.sleep(5)
             
             # Check if the app shows the correct location
             # This is simplified - in practice, would need OCR or UI automation
-            logcat_result = subprocess.run([
-                'adb', '-s', f'localhost:{self.adb_port}',
-                'shell', 'logcat', '-d', '-s', 'LocationManager:*'
-            ], capture_output=True, text=True, timeout=5)
+            # Only the most recent entries matter, so cap the dump instead of reading the whole buffer
+            _, logcat_output, _ = await self._adb('shell', 'logcat', '-d', '-t', '200', '-s', 'LocationManager:*',
+                                                  timeout=5)
             
             # Look for location updates in logs
-            return "location" in logcat_result.stdout.lower()
+            return b"location" in logcat_output or b"Location" in logcat_output
             
         except Exception as e:
             logger.error(f"App location detection test failed: {e}")
             return False
     
-    async def test_movement_path(self, path_name: str, waypoints: List[GeoPoint], 
+    async def test_movement_path(self, path_name: str, waypoints: np.ndarray, 
                                 speed_kmh: float = 30.0) -> MovementTestResult:
-        """Test GPS movement simulation along a path"""
+        """Test GPS movement simulation along an (N, 3) latitude/longitude/altitude path"""
         logger.info(f"Testing movement path: {path_name}")
         
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         actual_path = []
         
-        # Calculate expected total distance
-        expected_distance = 0.0
-        for i in range(len(waypoints) - 1):
-            expected_distance += self.calculate_distance(waypoints[i], waypoints[i + 1])
+        # Expected per-segment and total distance, precomputed for the built-in paths
+        if waypoints is self._test_paths_np.get(path_name):
+            expected_distance, segment_distances = self._path_geometry[path_name]
+        else:
+            expected_distance, segment_distances = self._compute_path_geometry(waypoints)
         
         # Calculate time per segment based on speed
         time_per_meter = 1.0 / (speed_kmh * 1000 / 3600)  # seconds per meter
         
         try:
-            for i, waypoint in enumerate(waypoints):
+            for i in range(len(waypoints)):
                 logger.info(f"Moving to waypoint {i + 1}/{len(waypoints)}")
                 
                 # Inject location
-                injection_success = await self.inject_gps_location(waypoint)
+                injection_success = await self.inject_gps_location(_row_to_geopoint(waypoints[i]))
                 if not injection_success:
                     logger.warning(f"Failed to inject waypoint {i + 1}")
                     continue
@@ -404,31 +528,25 @@ class GPSAccuracyTester:
                 
                 # Calculate delay to next waypoint based on distance and speed
                 if i < len(waypoints) - 1:
-                    segment_distance = self.calculate_distance(waypoints[i], waypoints[i + 1])
-                    delay_time = segment_distance * time_per_meter
+                    delay_time = segment_distances[i] * time_per_meter
                     await asyncio.sleep(min(delay_time, 30))  # Cap at 30 seconds per segment
         
         except Exception as e:
             logger.error(f"Movement path test failed: {e}")
         
         # Calculate actual total distance
-        actual_distance = 0.0
-        for i in range(len(actual_path) - 1):
-            actual_distance += self.calculate_distance(actual_path[i], actual_path[i + 1])
+        actual_array = _points_to_array(actual_path)
+        actual_distance = _path_length(actual_array)
         
         # Calculate maximum deviation from expected path
-        max_deviation = 0.0
-        for i, expected_point in enumerate(waypoints):
-            if i < len(actual_path):
-                deviation = self.calculate_distance(expected_point, actual_path[i])
-                max_deviation = max(max_deviation, deviation)
+        max_deviation = _max_deviation(waypoints, actual_array)
         
         # Calculate accuracy percentages
         distance_accuracy = 100.0
         if expected_distance > 0:
             distance_accuracy = max(0, 100 - abs(expected_distance - actual_distance) / expected_distance * 100)
         
-        duration = time.time() - start_time
+        duration = (time.monotonic_ns() - start_ns) / 1_000_000_000
         expected_duration = expected_distance * time_per_meter
         timing_accuracy = max(0, 100 - abs(duration - expected_duration) / expected_duration * 100)
         
@@ -438,7 +556,7 @@ class GPSAccuracyTester:
             container_id=self.container_id,
             path_name=path_name,
             waypoints=waypoints,
-            actual_path=actual_path,
+            actual_path=actual_array,
             total_distance_expected_m=expected_distance,
             total_distance_actual_m=actual_distance,
             average_speed_kmh=(actual_distance / 1000) / (duration / 3600) if duration > 0 else 0,
@@ -456,19 +574,24 @@ class GPSAccuracyTester:
         # Install location test app if available
         await self.install_location_test_app()
         
-        # Test static location accuracy
+        # Test static location accuracy concurrently; only the inject/read-back
+        # window is serialized (see test_location_accuracy)
         logger.info("Testing static location accuracy...")
-        for location_name, location in self.test_locations.items():
-            try:
-                result = await self.test_location_accuracy(location_name, location)
-                self.results.append(result)
-                
-                # Brief pause between tests
-                await asyncio.sleep(5)
-                
-            except Exception as e:
-                logger.error(f"Failed to test location {location_name}: {e}")
-                error_result = GPSTestResult(
+        semaphore = asyncio.Semaphore(STATIC_TEST_CONCURRENCY)
+        
+        async def run_location_test(location_name: str, location: GeoPoint) -> GPSTestResult:
+            async with semaphore:
+                return await self.test_location_accuracy(location_name, location)
+        
+        static_results = await asyncio.gather(
+            *[run_location_test(name, location) for name, location in self.test_locations.items()],
+            return_exceptions=True
+        )
+        
+        for (location_name, location), result in zip(self.test_locations.items(), static_results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to test location {location_name}: {result}")
+                result = GPSTestResult(
                     container_id=self.container_id,
                     test_name=f"GPS Accuracy - {location_name}",
                     expected_location=location,
@@ -479,13 +602,13 @@ class GPSAccuracyTester:
                     injection_success=False,
                     app_detection_success=False,
                     timestamp=datetime.now(),
-                    error=str(e)
+                    error=str(result)
                 )
-                self.results.append(error_result)
+            self.results.append(result)
         
         # Test movement paths
         logger.info("Testing movement path accuracy...")
-        for path_name, waypoints in self.test_paths.items():
+        for path_name, waypoints in self._test_paths_np.items():
             try:
                 result = await self.test_movement_path(path_name, waypoints)
                 self.movement_results.append(result)
@@ -503,23 +626,47 @@ class GPSAccuracyTester:
         if not self.results and not self.movement_results:
             return {"error": "No GPS test results available"}
         
+        # Accumulate static test aggregates in a single pass
+        n_static = len(self.results)
+        ok_injections = ok_detections = 0
+        accuracy_sum = response_time_sum = error_sum = 0.0
+        error_count = 0
+        for r in self.results:
+            ok_injections += r.injection_success
+            ok_detections += r.app_detection_success
+            accuracy_sum += r.accuracy_percentage
+            response_time_sum += r.response_time_ms
+            if not math.isinf(r.distance_error_meters):
+                error_sum += r.distance_error_meters
+                error_count += 1
+        
+        n_movement = len(self.movement_results)
+        path_accuracy_sum = timing_accuracy_sum = deviation_sum = 0.0
+        for r in self.movement_results:
+            path_accuracy_sum += r.path_accuracy_percentage
+            timing_accuracy_sum += r.timing_accuracy_percentage
+            deviation_sum += r.max_deviation_m
+        
+        static_accuracy = accuracy_sum / n_static if n_static else 0
+        movement_accuracy = path_accuracy_sum / n_movement if n_movement else 0
+        
         report = {
             "container_id": self.container_id,
-            "test_timestamp": datetime.now().isoformat(),
+            "test_timestamp": datetime.now(),
             "static_location_tests": {
-                "total_tests": len(self.results),
-                "successful_injections": sum(1 for r in self.results if r.injection_success),
-                "successful_detections": sum(1 for r in self.results if r.app_detection_success),
-                "average_accuracy_percentage": sum(r.accuracy_percentage for r in self.results) / len(self.results) if self.results else 0,
-                "average_distance_error_m": sum(r.distance_error_meters for r in self.results if r.distance_error_meters != float('inf')) / len([r for r in self.results if r.distance_error_meters != float('inf')]) if self.results else 0,
-                "average_response_time_ms": sum(r.response_time_ms for r in self.results) / len(self.results) if self.results else 0,
+                "total_tests": n_static,
+                "successful_injections": ok_injections,
+                "successful_detections": ok_detections,
+                "average_accuracy_percentage": static_accuracy,
+                "average_distance_error_m": error_sum / error_count if error_count else 0,
+                "average_response_time_ms": response_time_sum / n_static if n_static else 0,
                 "test_results": []
             },
             "movement_path_tests": {
-                "total_tests": len(self.movement_results),
-                "average_path_accuracy": sum(r.path_accuracy_percentage for r in self.movement_results) / len(self.movement_results) if self.movement_results else 0,
-                "average_timing_accuracy": sum(r.timing_accuracy_percentage for r in self.movement_results) / len(self.movement_results) if self.movement_results else 0,
-                "average_max_deviation_m": sum(r.max_deviation_m for r in self.movement_results) / len(self.movement_results) if self.movement_results else 0,
+                "total_tests": n_movement,
+                "average_path_accuracy": movement_accuracy,
+                "average_timing_accuracy": timing_accuracy_sum / n_movement if n_movement else 0,
+                "average_max_deviation_m": deviation_sum / n_movement if n_movement else 0,
                 "test_results": []
             }
         }
@@ -528,22 +675,14 @@ class GPSAccuracyTester:
         for result in self.results:
             report["static_location_tests"]["test_results"].append({
                 "test_name": result.test_name,
-                "expected_location": {
-                    "latitude": result.expected_location.latitude,
-                    "longitude": result.expected_location.longitude,
-                    "altitude": result.expected_location.altitude
-                },
-                "actual_location": {
-                    "latitude": result.actual_location.latitude,
-                    "longitude": result.actual_location.longitude,
-                    "altitude": result.actual_location.altitude
-                } if result.actual_location else None,
+                "expected_location": result.expected_location,
+                "actual_location": result.actual_location,
                 "distance_error_meters": result.distance_error_meters,
                 "accuracy_percentage": result.accuracy_percentage,
                 "response_time_ms": result.response_time_ms,
                 "injection_success": result.injection_success,
                 "app_detection_success": result.app_detection_success,
-                "timestamp": result.timestamp.isoformat(),
+                "timestamp": result.timestamp,
                 "error": result.error
             })
         
@@ -560,20 +699,18 @@ class GPSAccuracyTester:
                 "path_accuracy_percentage": result.path_accuracy_percentage,
                 "timing_accuracy_percentage": result.timing_accuracy_percentage,
                 "duration_seconds": result.duration_seconds,
-                "timestamp": result.timestamp.isoformat()
+                "timestamp": result.timestamp
             })
         
         # Overall GPS system performance
         overall_accuracy = 0.0
         if self.results:
-            static_accuracy = sum(r.accuracy_percentage for r in self.results) / len(self.results)
-            movement_accuracy = sum(r.path_accuracy_percentage for r in self.movement_results) / len(self.movement_results) if self.movement_results else 0
             overall_accuracy = (static_accuracy + movement_accuracy) / 2 if self.movement_results else static_accuracy
         
         report["overall_gps_performance"] = {
             "overall_accuracy_percentage": overall_accuracy,
-            "injection_success_rate": (sum(1 for r in self.results if r.injection_success) / len(self.results)) * 100 if self.results else 0,
-            "detection_success_rate": (sum(1 for r in self.results if r.app_detection_success) / len(self.results)) * 100 if self.results else 0,
+            "injection_success_rate": (ok_injections / n_static) * 100 if n_static else 0,
+            "detection_success_rate": (ok_detections / n_static) * 100 if n_static else 0,
             "recommendation": "Excellent" if overall_accuracy > 90 else "Good" if overall_accuracy > 75 else "Needs Improvement"
         }
         
@@ -593,11 +730,18 @@ async def main():
     static_results, movement_results = await tester.run_comprehensive_gps_test()
     report = tester.generate_gps_report()
     
-    print(json.dumps(report, indent=2))
+    payload = orjson.dumps(
+        report,
+        default=_json_default,
+        option=(orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+                | orjson.OPT_PASSTHROUGH_DATACLASS)
+    )
+    sys.stdout.buffer.write(payload)
+    sys.stdout.flush()
     
     # Save report to file
-    with open(f"/tmp/gps_accuracy_report_{container_id}_{int(time.time())}.json", 'w') as f:
-        json.dump(report, f, indent=2)
+    with open(f"/tmp/gps_accuracy_report_{container_id}_{int(time.time())}.json", 'wb') as f:
+        f.write(payload)
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
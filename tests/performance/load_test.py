@@ -5,22 +5,56 @@ Tests system performance under various load conditions
 """
 
 import asyncio
-import json
 import logging
+import math
+import os
 import time
 import psutil
 import docker
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
-import subprocess
+import numpy as np
+import orjson
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import threading
 from dataclasses import dataclass, asdict
 import concurrent.futures
 import statistics
 
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+    
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as plain Python"""
+        return lambda func: func
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Container metrics collections allowed in flight during one monitoring cycle
+METRICS_CONCURRENCY = 16
+
+# Calls to get_system_metrics closer together than this reuse the previous sample
+SYSTEM_METRICS_MIN_INTERVAL = 1.0
+
+# Disk usage and network counters change slowly and are refreshed at most this often
+SLOW_METRICS_INTERVAL = 30.0
+
+# How long one `adb devices` listing is shared by concurrent responsiveness probes
+ADB_PROBE_TTL = 1.0
+
+# Delays between container readiness checks after start, about 11 s in total
+READINESS_BACKOFF = (0.1, 0.2, 0.4, 0.8, 1.6, 3.2, 5.0)
+
+# Samples kept per buffer when monitoring is started without a test duration
+DEFAULT_MONITOR_CAPACITY = 1024
+
+# Where docker places container cgroups, for the systemd and cgroupfs drivers
+CGROUP_ROOT = '/sys/fs/cgroup'
+CGROUP_LAYOUTS = ('system.slice/docker-{id}.scope', 'docker/{id}')
+
 @dataclass
 class SystemMetrics:
     timestamp: datetime
@@ -60,12 +94,280 @@ class LoadTestResult:
     avg_response_time: float
     max_response_time: float
     min_response_time: float
-    system_metrics: List[SystemMetrics]
-    container_metrics: List[ContainerMetrics]
+    system_metrics: Dict[str, np.ndarray]
+    container_metrics: Dict[str, Dict[str, np.ndarray]]
     errors: List[str]
     start_time: datetime
     end_time: datetime
 
+# Column layouts for buffered samples; string fields are kept per container instead
+SYSTEM_COLUMNS = {
+    'timestamp': 'datetime64[us]',
+    'cpu_percent': np.float32,
+    'memory_percent': np.float32,
+    'memory_used_gb': np.float32,
+    'memory_available_gb': np.float32,
+    'disk_usage_percent': np.float32,
+    'disk_free_gb': np.float32,
+    'network_bytes_sent': np.int64,
+    'network_bytes_recv': np.int64,
+    'load_average_1min': np.float32,
+    'active_containers': np.int32,
+}
+
+CONTAINER_COLUMNS = {
+    'cpu_percent': np.float32,
+    'memory_usage_mb': np.float32,
+    'memory_limit_mb': np.float32,
+    'network_rx_bytes': np.int64,
+    'network_tx_bytes': np.int64,
+    'block_read_bytes': np.int64,
+    'block_write_bytes': np.int64,
+    'pids': np.int32,
+    'uptime_seconds': np.float64,
+}
+
+def _encode_series(values: np.ndarray) -> np.ndarray:
+    """Compress-friendly encoding of one metric column for the raw metrics archive
+    
+    Timestamps become delta-of-delta, floats are XORed with their predecessor's
+    bits (Gorilla style) and integer counters become deltas, so steady series
+    turn into runs of zeros that savez_compressed squeezes well
+    """
+    if values.dtype.kind == 'M':
+        ticks = values.view(np.int64)
+        return np.concatenate((ticks[:1], np.diff(ticks[:2]), np.diff(ticks, 2)))
+    if values.dtype.kind == 'f':
+        bits = values.view(np.uint32 if values.dtype.itemsize == 4 else np.uint64)
+        return np.concatenate((bits[:1], bits[1:] ^ bits[:-1]))
+    return np.concatenate((values[:1], np.diff(values)))
+
+def _decode_series(encoded: np.ndarray, dtype) -> np.ndarray:
+    """Inverse of _encode_series for a column of the given dtype"""
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'M':
+        deltas = np.cumsum(encoded[1:])
+        return np.concatenate((encoded[:1], encoded[0] + np.cumsum(deltas))).view(dtype)
+    if dtype.kind == 'f':
+        return np.bitwise_xor.accumulate(encoded).view(dtype)
+    return np.cumsum(encoded).astype(dtype)
+
+def _columns_to_lists(columns: Dict[str, np.ndarray]) -> Dict[str, List]:
+    """JSON-friendly copy of a column snapshot, with timestamps as ISO strings"""
+    return {
+        name: np.datetime_as_string(column).tolist() if column.dtype.kind == 'M' else column.tolist()
+        for name, column in columns.items()
+    }
+
+class _ColumnBuffer:
+    """Fixed-capacity columnar ring of metric samples, one NumPy array per field
+    
+    Once full, each new sample overwrites the oldest, so memory stays bounded
+    however long monitoring runs
+    """
+    
+    def __init__(self, columns: Dict, capacity: int):
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in columns.items()}
+        self._capacity = capacity
+        self._count = 0
+    
+    def __len__(self) -> int:
+        return min(self._count, self._capacity)
+    
+    def append(self, sample):
+        """Store the matching fields of a metrics dataclass as the next row"""
+        row = self._count % self._capacity
+        for name, column in self._columns.items():
+            column[row] = getattr(sample, name)
+        self._count += 1
+    
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Oldest-first copy of the retained rows of every column, or an empty dict if nothing was stored"""
+        if not self._count:
+            return {}
+        if self._count <= self._capacity:
+            return {name: column[:self._count].copy() for name, column in self._columns.items()}
+        
+        oldest = self._count % self._capacity
+        return {name: np.concatenate((column[oldest:], column[:oldest])) for name, column in self._columns.items()}
+
+@njit(cache=True, fastmath=True)
+def _sys_reduce_nb(cpu, mem, active):
+    """Mean and max of CPU and memory plus peak active containers, in one pass"""
+    cpu_sum = 0.0
+    mem_sum = 0.0
+    cpu_max = cpu[0]
+    mem_max = mem[0]
+    active_max = active[0]
+    for i in range(cpu.shape[0]):
+        cpu_sum += cpu[i]
+        mem_sum += mem[i]
+        cpu_max = max(cpu_max, cpu[i])
+        mem_max = max(mem_max, mem[i])
+        active_max = max(active_max, active[i])
+    return cpu_sum / cpu.shape[0], cpu_max, mem_sum / mem.shape[0], mem_max, active_max
+
+@njit(cache=True, fastmath=True)
+def _container_reduce_nb(cpu, mem):
+    """Mean and max of container CPU and memory, in one pass"""
+    cpu_sum = 0.0
+    mem_sum = 0.0
+    cpu_max = cpu[0]
+    mem_max = mem[0]
+    for i in range(cpu.shape[0]):
+        cpu_sum += cpu[i]
+        mem_sum += mem[i]
+        cpu_max = max(cpu_max, cpu[i])
+        mem_max = max(mem_max, mem[i])
+    return cpu_sum / cpu.shape[0], cpu_max, mem_sum / mem.shape[0], mem_max
+
+def _system_summary(cpu: np.ndarray, mem: np.ndarray, active: np.ndarray) -> Tuple:
+    """(avg cpu, max cpu, avg memory, max memory, peak active), using the JIT kernel when available"""
+    if HAVE_NUMBA:
+        return _sys_reduce_nb(cpu, mem, active)
+    return cpu.mean(dtype=np.float64), cpu.max(), mem.mean(dtype=np.float64), mem.max(), active.max()
+
+def _container_summary(cpu: np.ndarray, mem: np.ndarray) -> Tuple:
+    """(avg cpu, max cpu, avg memory, max memory), using the JIT kernel when available"""
+    if HAVE_NUMBA:
+        return _container_reduce_nb(cpu, mem)
+    return cpu.mean(dtype=np.float64), cpu.max(), mem.mean(dtype=np.float64), mem.max()
+
+def _read_cgroup_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+def _find_cgroup(container_id: str) -> Optional[Tuple[str, ...]]:
+    """Locate a container's cgroup as ('v2', dir) or ('v1', memory, cpuacct, pids, blkio dirs)"""
+    for layout in CGROUP_LAYOUTS:
+        relative = layout.format(id=container_id)
+        unified = f'{CGROUP_ROOT}/{relative}'
+        if os.path.exists(f'{unified}/cpu.stat') and os.path.exists(f'{unified}/memory.current'):
+            return ('v2', unified)
+        
+        controllers = tuple(f'{CGROUP_ROOT}/{name}/{relative}' for name in ('memory', 'cpuacct', 'pids', 'blkio'))
+        if all(os.path.isdir(path) for path in controllers):
+            return ('v1',) + controllers
+    return None
+
+def _build_stats_extractor(sample: Dict) -> Tuple[Callable[[Dict], int], Callable[[Dict, int], Tuple[float, int, int, int, int, int]], bool]:
+    """Build a CPU counter and a metrics extractor specialized to the key layout of a daemon's stats
+    
+    Which keys exist depends on the daemon and cgroup version, so the choices are made once
+    and the returned functions index directly. The flag is False when the sample lacks memory,
+    system CPU or PIDs figures, as samples from starting or stopping containers can, in which
+    case the functions should not be reused for other samples
+    """
+    cpu_stats = sample['cpu_stats']
+    memory_stats = sample.get('memory_stats') or {}
+    
+    # cgroup v1 reports per-CPU usage, v2 only the online CPU count
+    if 'percpu_usage' in cpu_stats['cpu_usage']:
+        def count_cpus(stats: Dict) -> int:
+            return len(stats['cpu_stats']['cpu_usage']['percpu_usage']) or 1
+    elif 'online_cpus' in cpu_stats:
+        def count_cpus(stats: Dict) -> int:
+            return stats['cpu_stats']['online_cpus'] or 1
+    else:
+        def count_cpus(stats: Dict) -> int:
+            return 1
+    
+    # Linux daemons report usage, older ones usage_in_bytes, Windows ones privateworkingset
+    usage_key = next((key for key in ('usage', 'usage_in_bytes', 'privateworkingset') if key in memory_stats), None)
+    has_limit = 'limit' in memory_stats
+    has_system = 'system_cpu_usage' in cpu_stats
+    has_blkio = 'blkio_stats' in sample
+    has_pids = 'current' in (sample.get('pids_stats') or {})
+    
+    def extract(stats: Dict, cpu_count: int) -> Tuple[float, int, int, int, int, int]:
+        cpu_stats = stats['cpu_stats']
+        precpu_stats = stats['precpu_stats']
+        
+        # The first streamed sample has an empty precpu_stats and so no baseline to diff against
+        cpu_percent = 0.0
+        if has_system and 'system_cpu_usage' in precpu_stats:
+            system_delta = cpu_stats['system_cpu_usage'] - precpu_stats['system_cpu_usage']
+            if system_delta > 0:
+                cpu_delta = cpu_stats['cpu_usage']['total_usage'] - precpu_stats['cpu_usage']['total_usage']
+                cpu_percent = (cpu_delta / system_delta) * cpu_count * 100.0
+        
+        memory_stats = stats['memory_stats']
+        memory_usage = memory_stats[usage_key] if usage_key else 0
+        memory_limit = memory_stats['limit'] if has_limit else 0
+        
+        # Block I/O stats, read and write totals in one pass
+        block_read = block_write = 0
+        for stat in (stats['blkio_stats'].get('io_service_bytes_recursive') if has_blkio else None) or ():
+            op = stat['op']
+            if op == 'Read':
+                block_read += stat['value']
+            elif op == 'Write':
+                block_write += stat['value']
+        
+        pids = stats['pids_stats']['current'] if has_pids else 0
+        
+        return cpu_percent, memory_usage, memory_limit, block_read, block_write, pids
+    
+    complete = usage_key is not None and has_limit and has_system and has_pids
+    return count_cpus, extract, complete
+
+class _StatsStreamer:
+    """Keeps one streaming stats reader per container and caches its latest sample"""
+    
+    def __init__(self, api_client):
+        self.api_client = api_client
+        self._latest: Dict[str, Dict] = {}
+        self._stop_events: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+    
+    def start(self, container_id: str):
+        """Start pumping stats for a container unless a reader is already running"""
+        with self._lock:
+            if container_id in self._stop_events:
+                return
+            stop_event = threading.Event()
+            self._stop_events[container_id] = stop_event
+        
+        threading.Thread(target=self._pump_stats, args=(container_id, stop_event), daemon=True).start()
+    
+    def _pump_stats(self, container_id: str, stop_event: threading.Event):
+        stream = None
+        try:
+            stream = self.api_client.stats(container_id, stream=True, decode=True)
+            for sample in stream:
+                if stop_event.is_set():
+                    break
+                self._latest[container_id] = sample
+        except Exception as e:
+            logger.warning(f"Stats stream for {container_id[:12]} ended: {e}")
+        finally:
+            if stream is not None:
+                stream.close()
+            with self._lock:
+                # A restarted reader owns a fresh event; only clean up our own entry
+                if self._stop_events.get(container_id) is stop_event:
+                    del self._stop_events[container_id]
+                    self._latest.pop(container_id, None)
+    
+    def latest(self, container_id: str) -> Optional[Dict]:
+        """Most recent stats sample for a container, or None if no reader has produced one"""
+        return self._latest.get(container_id)
+    
+    def stop(self, container_id: str):
+        """Stop the reader for a container; it exits on its next sample"""
+        with self._lock:
+            stop_event = self._stop_events.pop(container_id, None)
+            self._latest.pop(container_id, None)
+        if stop_event:
+            stop_event.set()
+    
+    def stop_all(self):
+        """Stop every running reader"""
+        with self._lock:
+            container_ids = list(self._stop_events)
+        for container_id in container_ids:
+            self.stop(container_id)
+
 class LoadTester:
     """Comprehensive load testing framework for Android containers"""
     
@@ -73,30 +375,65 @@ class LoadTester:
         self.docker_client = docker_client or docker.from_env()
         self.results: List[LoadTestResult] = []
         self.monitoring_active = False
-        self.system_metrics: List[SystemMetrics] = []
-        self.container_metrics: List[ContainerMetrics] = []
+        self._monitor_capacity = DEFAULT_MONITOR_CAPACITY
+        self.system_metrics = _ColumnBuffer(SYSTEM_COLUMNS, self._monitor_capacity)
+        self.container_metrics: Dict[str, _ColumnBuffer] = {}
+        # One pooled low-level client shared by every metrics call, sized for the monitor's fan-out
+        self._api = docker.APIClient(timeout=5, max_pool_size=METRICS_CONCURRENCY * 2,
+                                     **docker.utils.kwargs_from_env())
+        self._streamer = _StatsStreamer(self._api)
+        
+        # Name and start time never change for a container, so each is inspected only once
+        self._container_info: Dict[str, Tuple[str, datetime]] = {}
+        self._ncpu_cache: Dict[str, int] = {}
+        self._count_cpus: Optional[Callable[[Dict], int]] = None
+        self._extract: Optional[Callable[[Dict, int], Tuple[float, int, int, int, int, int]]] = None
+        # None records a container whose cgroup was not found, so the lookup is not repeated every cycle
+        self._cgroups: Dict[str, Optional[Tuple[str, ...]]] = {}
+        self._cgroup_cpu_prev: Dict[str, Tuple[int, float]] = {}
+        self._host_memory_total = psutil.virtual_memory().total
+        self._image_cache: Dict[str, str] = {}
+        
+        # Prime psutil's CPU counters so later non-blocking reads measure since the previous call
+        psutil.cpu_percent(interval=None)
+        self._last_sys_metrics: Optional[SystemMetrics] = None
+        self._last_sys_metrics_ts = 0.0
+        self._slow_cached: Optional[Tuple[Any, Any]] = None
+        self._slow_last_ts = 0.0
+        
+        # ADB connections are made once per container and probed through a persistent shell
+        self._adb_server_started = False
+        self._adb_addresses: Dict[str, str] = {}
+        self._adb_shells: Dict[str, asyncio.subprocess.Process] = {}
+        self._adb_devices: set = set()
+        self._adb_devices_ts = 0.0
+        self._adb_probe_lock = asyncio.Lock()
+        
+    def get_system_metrics(self, active_containers: Optional[int] = None) -> SystemMetrics:
+        """Collect current system metrics; pass active_containers when the caller has already listed them"""
+        now = time.monotonic()
+        if self._last_sys_metrics is not None and now - self._last_sys_metrics_ts < SYSTEM_METRICS_MIN_INTERVAL:
+            return self._last_sys_metrics
         
-    def get_system_metrics(self) -> SystemMetrics:
-        """Collect current system metrics"""
         try:
-            # CPU and Memory
-            cpu_percent = psutil.cpu_percent(interval=1)
+            # CPU usage since the previous call, without blocking for a sample window
+            cpu_percent = psutil.cpu_percent(interval=None)
             memory = psutil.virtual_memory()
             
-            # Disk usage
-            disk = psutil.disk_usage('/')
-            
-            # Network stats
-            network = psutil.net_io_counters()
+            # Disk usage of / and network counters, reused between slow refreshes
+            if self._slow_cached is None or now - self._slow_last_ts >= SLOW_METRICS_INTERVAL:
+                self._slow_cached = (psutil.disk_usage('/'), psutil.net_io_counters())
+                self._slow_last_ts = now
+            disk, network = self._slow_cached
             
             # Load average (Unix-like systems)
             load_avg = psutil.getloadavg()[0] if hasattr(psutil, 'getloadavg') else 0.0
             
-            # Active containers count
-            containers = self.docker_client.containers.list()
-            active_containers = len([c for c in containers if c.status == 'running'])
+            # Active containers count; list() only returns running containers
+            if active_containers is None:
+                active_containers = len(self.docker_client.containers.list())
             
-            return SystemMetrics(
+            self._last_sys_metrics = SystemMetrics(
                 timestamp=datetime.now(),
                 cpu_percent=cpu_percent,
                 memory_percent=memory.percent,
@@ -109,6 +446,8 @@ class LoadTester:
                 load_average_1min=load_avg,
                 active_containers=active_containers
             )
+            self._last_sys_metrics_ts = now
+            return self._last_sys_metrics
         except Exception as e:
             logger.error(f"Failed to collect system metrics: {e}")
             return SystemMetrics(
@@ -125,48 +464,137 @@ class LoadTester:
                 active_containers=0
             )
     
-    def get_container_metrics(self, container_id: str) -> Optional[ContainerMetrics]:
-        """Collect metrics for a specific container"""
+    def _stats_container_metrics(self, container_id: str, stats: Dict) -> Tuple[float, int, int, int, int, int]:
+        """The same figures as _sysfs_container_metrics, taken from a docker stats sample"""
         try:
-            container = self.docker_client.containers.get(container_id)
-            stats = container.stats(stream=False)
-            
-            # Calculate CPU percentage
-            cpu_delta = stats['cpu_stats']['cpu_usage']['total_usage'] - \
-                       stats['precpu_stats']['cpu_usage']['total_usage']
-            system_delta = stats['cpu_stats']['system_cpu_usage'] - \
-                          stats['precpu_stats']['system_cpu_usage']
-            
-            cpu_percent = 0.0
-            if system_delta > 0.0:
-                cpu_percent = (cpu_delta / system_delta) * len(stats['cpu_stats']['cpu_usage']['percpu_usage']) * 100.0
-            
-            # Memory usage
-            memory_usage = stats['memory_stats']['usage']
-            memory_limit = stats['memory_stats']['limit']
+            return self._extract_stats(container_id, stats)
+        except KeyError:
+            # The sample no longer matches the layout the extractor was built for; rebuild it once
+            self._count_cpus = self._extract = None
+            return self._extract_stats(container_id, stats)
+    
+    def _extract_stats(self, container_id: str, stats: Dict) -> Tuple[float, int, int, int, int, int]:
+        # Every container reports through the same daemon, so one extractor serves them all
+        count_cpus, extract = self._count_cpus, self._extract
+        if extract is None:
+            count_cpus, extract, complete = _build_stats_extractor(stats)
+            # Only an extractor built from a full sample is kept for later samples
+            if complete:
+                self._count_cpus, self._extract = count_cpus, extract
+        
+        # A container's CPU count is fixed, so it is taken from the first sample only
+        cpu_count = self._ncpu_cache.get(container_id)
+        if cpu_count is None:
+            cpu_count = self._ncpu_cache[container_id] = count_cpus(stats)
+        
+        return extract(stats, cpu_count)
+    
+    def _sysfs_container_metrics(self, container_id: str) -> Optional[Tuple[Optional[float], int, int, int, int, int]]:
+        """CPU %, memory usage/limit, block read/write bytes and PIDs read straight from the container's cgroup
+        
+        Returns None when the cgroup cannot be found or read, e.g. on non-Linux hosts. CPU % is None
+        on the first read of a container, since it needs a previous reading to compare against
+        """
+        if container_id in self._cgroups:
+            cgroup = self._cgroups[container_id]
+        else:
+            cgroup = self._cgroups[container_id] = _find_cgroup(container_id)
+        if cgroup is None:
+            return None
+        
+        try:
+            block_read = block_write = 0
+            if cgroup[0] == 'v2':
+                base = cgroup[1]
+                cpu_stat = dict(line.split() for line in _read_cgroup_file(f'{base}/cpu.stat').splitlines())
+                cpu_usage_usec = int(cpu_stat['usage_usec'])
+                memory_usage = int(_read_cgroup_file(f'{base}/memory.current'))
+                memory_max = _read_cgroup_file(f'{base}/memory.max').strip()
+                memory_limit = self._host_memory_total if memory_max == 'max' else int(memory_max)
+                pids_path = f'{base}/pids.current'
+                pids = int(_read_cgroup_file(pids_path)) if os.path.exists(pids_path) else 0
+                
+                # Lines look like "8:0 rbytes=1 wbytes=2 rios=3 ..."
+                io_path = f'{base}/io.stat'
+                if os.path.exists(io_path):
+                    for line in _read_cgroup_file(io_path).splitlines():
+                        for field in line.split()[1:]:
+                            key, _, value = field.partition('=')
+                            if key == 'rbytes':
+                                block_read += int(value)
+                            elif key == 'wbytes':
+                                block_write += int(value)
+            else:
+                memory_dir, cpuacct_dir, pids_dir, blkio_dir = cgroup[1:]
+                cpu_usage_usec = int(_read_cgroup_file(f'{cpuacct_dir}/cpuacct.usage')) // 1000
+                memory_usage = int(_read_cgroup_file(f'{memory_dir}/memory.usage_in_bytes'))
+                memory_limit = min(int(_read_cgroup_file(f'{memory_dir}/memory.limit_in_bytes')),
+                                   self._host_memory_total)
+                pids = int(_read_cgroup_file(f'{pids_dir}/pids.current'))
+                
+                # Lines look like "8:0 Read 1234", with a trailing "Total N"
+                for line in _read_cgroup_file(f'{blkio_dir}/blkio.throttle.io_service_bytes').splitlines():
+                    parts = line.split()
+                    if len(parts) == 3:
+                        if parts[1] == 'Read':
+                            block_read += int(parts[2])
+                        elif parts[1] == 'Write':
+                            block_write += int(parts[2])
+        except (OSError, ValueError, KeyError) as e:
+            logger.debug(f"cgroup read failed for {container_id[:12]}: {e}")
+            self._cgroups.pop(container_id, None)
+            return None
+        
+        # CPU usage is a cumulative counter, so the percentage is taken against the previous read
+        now = time.monotonic()
+        previous = self._cgroup_cpu_prev.get(container_id)
+        self._cgroup_cpu_prev[container_id] = (cpu_usage_usec, now)
+        cpu_percent = None
+        if previous and now > previous[1]:
+            cpu_percent = (cpu_usage_usec - previous[0]) / ((now - previous[1]) * 1_000_000) * 100.0
+        
+        return cpu_percent, memory_usage, memory_limit, block_read, block_write, pids
+    
+    def get_container_metrics(self, container_id: str, status: str = 'running') -> Optional[ContainerMetrics]:
+        """Collect metrics for a specific container, whose status the caller already knows
+        
+        Cgroup files are read directly when available; the streamed stats sample
+        supplies network counters and everything else on hosts without them
+        """
+        stats = self._streamer.latest(container_id)
+        cgroup_metrics = self._sysfs_container_metrics(container_id)
+        if stats is None and cgroup_metrics is None:
+            return None
+        
+        try:
+            if cgroup_metrics is not None:
+                cpu_percent, memory_usage, memory_limit, block_read, block_write, pids = cgroup_metrics
+                if cpu_percent is None:
+                    # No previous cgroup reading yet, so take this sample's CPU % from docker stats
+                    cpu_percent = self._stats_container_metrics(container_id, stats)[0] if stats is not None else 0.0
+            else:
+                cpu_percent, memory_usage, memory_limit, block_read, block_write, pids = \
+                    self._stats_container_metrics(container_id, stats)
             
             # Network stats
-            network_stats = stats.get('networks', {})
-            network_rx = sum(net['rx_bytes'] for net in network_stats.values())
-            network_tx = sum(net['tx_bytes'] for net in network_stats.values())
-            
-            # Block I/O stats
-            blkio_stats = stats.get('blkio_stats', {})
-            block_read = sum(stat['value'] for stat in blkio_stats.get('io_service_bytes_recursive', []) 
-                           if stat['op'] == 'Read')
-            block_write = sum(stat['value'] for stat in blkio_stats.get('io_service_bytes_recursive', [])
-                            if stat['op'] == 'Write')
-            
-            # PIDs count
-            pids = stats.get('pids_stats', {}).get('current', 0)
+            network_rx = network_tx = 0
+            for net in ((stats or {}).get('networks') or {}).values():
+                network_rx += net['rx_bytes']
+                network_tx += net['tx_bytes']
             
             # Container info
-            container.reload()
-            uptime = (datetime.now() - datetime.fromisoformat(container.attrs['State']['StartedAt'].replace('Z', '+00:00').replace('T', ' '))).total_seconds()
+            if container_id not in self._container_info:
+                info = self._api.inspect_container(container_id)
+                self._container_info[container_id] = (
+                    info['Name'].lstrip('/'),
+                    datetime.fromisoformat(info['State']['StartedAt'].replace('Z', '+00:00'))
+                )
+            container_name, started_at = self._container_info[container_id]
+            uptime = (datetime.now(tz=timezone.utc) - started_at).total_seconds()
             
             return ContainerMetrics(
                 container_id=container_id,
-                container_name=container.name,
+                container_name=container_name,
                 cpu_percent=cpu_percent,
                 memory_usage_mb=memory_usage / (1024**2),
                 memory_limit_mb=memory_limit / (1024**2),
@@ -175,7 +603,7 @@ class LoadTester:
                 block_read_bytes=block_read,
                 block_write_bytes=block_write,
                 pids=pids,
-                status=container.status,
+                status=status,
                 uptime_seconds=uptime
             )
             
@@ -183,59 +611,125 @@ class LoadTester:
             logger.error(f"Failed to collect container metrics for {container_id}: {e}")
             return None
     
-    def start_monitoring(self, interval: int = 5):
-        """Start system and container monitoring"""
+    def start_monitoring(self, interval: int = 5, duration: Optional[int] = None):
+        """Start system and container monitoring, keeping about duration seconds of samples"""
         self.monitoring_active = True
-        self.system_metrics = []
-        self.container_metrics = []
+        self._monitor_capacity = math.ceil(duration / interval) + 10 if duration else DEFAULT_MONITOR_CAPACITY
+        self.system_metrics = _ColumnBuffer(SYSTEM_COLUMNS, self._monitor_capacity)
+        self.container_metrics = {}
+        
+        self.monitor_thread = threading.Thread(target=asyncio.run, args=(self._monitor_loop(interval),), daemon=True)
+        self.monitor_thread.start()
+        logger.info(f"Started monitoring with {interval}s interval")
+    
+    async def _monitor_loop(self, interval: int):
+        """Collect system and per-container metrics every interval on the monitor thread's event loop"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(METRICS_CONCURRENCY)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=METRICS_CONCURRENCY)
         
-        def monitor():
+        # Container samples still outstanding at this point are dropped rather than stalling the cycle
+        deadline = max(interval - 1, 1)
+        
+        async def collect(container_id: str, status: str) -> Optional[ContainerMetrics]:
+            async with semaphore:
+                return await loop.run_in_executor(pool, self.get_container_metrics, container_id, status)
+        
+        try:
             while self.monitoring_active:
+                cycle_start = loop.time()
+                
+                # One container listing per cycle, shared by the system and container metrics
+                containers = await loop.run_in_executor(pool, self.docker_client.containers.list)
+                running = [container for container in containers if container.status == 'running']
+                
                 # Collect system metrics
-                sys_metrics = self.get_system_metrics()
+                sys_metrics = await loop.run_in_executor(pool, self.get_system_metrics, len(running))
                 self.system_metrics.append(sys_metrics)
                 
-                # Collect container metrics for all running containers
-                containers = self.docker_client.containers.list()
-                for container in containers:
-                    if container.status == 'running':
-                        container_metrics = self.get_container_metrics(container.id)
-                        if container_metrics:
-                            self.container_metrics.append(container_metrics)
+                # Collect container metrics for all running containers concurrently
+                tasks = []
+                for container in running:
+                    self._streamer.start(container.id)
+                    tasks.append(asyncio.ensure_future(collect(container.id, container.status)))
                 
-                time.sleep(interval)
-        
-        self.monitor_thread = threading.Thread(target=monitor, daemon=True)
-        self.monitor_thread.start()
-        logger.info(f"Started monitoring with {interval}s interval")
+                if tasks:
+                    done, pending = await asyncio.wait(tasks, timeout=deadline)
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        logger.warning(f"Dropped {len(pending)} container samples that missed the {deadline}s deadline")
+                    
+                    for task in done:
+                        if task.exception() is None and task.result():
+                            sample = task.result()
+                            if sample.container_id not in self.container_metrics:
+                                self.container_metrics[sample.container_id] = _ColumnBuffer(CONTAINER_COLUMNS,
+                                                                                            self._monitor_capacity)
+                            self.container_metrics[sample.container_id].append(sample)
+                
+                await asyncio.sleep(max(0, interval - (loop.time() - cycle_start)))
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
     
     def stop_monitoring(self):
         """Stop system monitoring"""
         self.monitoring_active = False
         if hasattr(self, 'monitor_thread'):
             self.monitor_thread.join(timeout=10)
+        self._streamer.stop_all()
+        self._api.close()
         logger.info("Stopped monitoring")
     
+    def _resolve_image(self, image: str) -> str:
+        """Image ID for a tag, inspected once per tester and pulled only if it is not present locally"""
+        image_id = self._image_cache.get(image)
+        if image_id is None:
+            try:
+                image_id = self.docker_client.images.get(image).id
+            except docker.errors.ImageNotFound:
+                image_id = self.docker_client.images.pull(image).id
+            self._image_cache[image] = image_id
+        return image_id
+    
     async def create_container(self, image: str, container_name: str) -> Optional[str]:
         """Create and start a new Android container"""
         try:
-            container = self.docker_client.containers.run(
-                image=image,
+            # Low-level create + start from the cached image ID, so no pull check happens per container
+            api = self.docker_client.api
+            created = api.create_container(
+                image=self._resolve_image(image),
                 name=container_name,
                 detach=True,
-                privileged=True,
-                ports={'5555/tcp': None},  # Expose ADB port
+                ports=[5555],  # Expose ADB port
                 environment={
                     'DISPLAY': ':99',
                     'GPU': '1'
                 },
-                volumes={
-                    '/tmp/.X11-unix': {'bind': '/tmp/.X11-unix', 'mode': 'rw'}
-                }
+                host_config=api.create_host_config(
+                    privileged=True,
+                    port_bindings={5555: None},
+                    binds={
+                        '/tmp/.X11-unix': {'bind': '/tmp/.X11-unix', 'mode': 'rw'}
+                    }
+                )
             )
+            api.start(created['Id'])
+            container = self.docker_client.containers.get(created['Id'])
+            
+            # Start streaming stats so the monitor never has to poll for them
+            self._streamer.start(container.id)
+            
+            # Wait for container to be ready, backing off instead of sleeping a fixed 10 seconds
+            for delay in READINESS_BACKOFF:
+                await asyncio.sleep(delay)
+                container.reload()
+                if container.status == 'running' and container.ports.get('5555/tcp'):
+                    break
+            else:
+                logger.warning(f"Container {container_name} not ready after {sum(READINESS_BACKOFF):.1f}s")
             
-            # Wait for container to be ready
-            await asyncio.sleep(10)
+            await self._connect_adb(container.id)
             
             logger.info(f"Created container: {container_name} ({container.id[:12]})")
             return container.id
@@ -244,35 +738,131 @@ class LoadTester:
             logger.error(f"Failed to create container {container_name}: {e}")
             return None
     
-    async def test_container_responsiveness(self, container_id: str) -> Tuple[bool, float]:
-        """Test if container is responsive via ADB"""
+    async def _teardown_container(self, container_id: str):
+        """Release a container's readers and ADB session, then stop and remove it"""
+        self._streamer.stop(container_id)
+        self._container_info.pop(container_id, None)
+        self._ncpu_cache.pop(container_id, None)
+        self._cgroups.pop(container_id, None)
+        self._cgroup_cpu_prev.pop(container_id, None)
+        await self._disconnect_adb(container_id)
+        
+        def stop_and_remove():
+            container = self.docker_client.containers.get(container_id)
+            # Short grace period; containers ignoring SIGTERM are killed instead of holding up cleanup
+            container.stop(timeout=2)
+            container.remove(force=True)
+        
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, stop_and_remove)
+            logger.info(f"Cleaned up container {container_id[:12]}")
+        except Exception as e:
+            logger.error(f"Failed to cleanup container {container_id[:12]}: {e}")
+    
+    async def _run_adb(self, *args: str, timeout: float = 10) -> str:
+        """Run a one-off adb command and return its stdout"""
+        proc = await asyncio.create_subprocess_exec(
+            'adb', *args,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        try:
+            stdout, _ = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            raise
+        return stdout.decode(errors='replace')
+    
+    async def _connect_adb(self, container_id: str) -> bool:
+        """Connect ADB to a container's mapped port once and remember the address"""
         try:
             container = self.docker_client.containers.get(container_id)
-            
-            # Get container port mapping
             port_info = container.ports.get('5555/tcp')
             if not port_info:
-                return False, 0.0
+                return False
+            
+            if not self._adb_server_started:
+                await self._run_adb('start-server')
+                self._adb_server_started = True
             
-            host_port = port_info[0]['HostPort']
+            address = f"localhost:{port_info[0]['HostPort']}"
+            output = await self._run_adb('connect', address)
+            if 'connected' not in output.lower():
+                return False
+            
+            self._adb_addresses[container_id] = address
+            return True
+            
+        except Exception as e:
+            logger.error(f"ADB connect failed for {container_id[:12]}: {e}")
+            return False
+    
+    async def _disconnect_adb(self, container_id: str):
+        """Close a container's persistent shell and drop its ADB connection"""
+        await self._close_adb_shell(container_id)
+        address = self._adb_addresses.pop(container_id, None)
+        if address:
+            try:
+                await self._run_adb('disconnect', address, timeout=5)
+            except Exception as e:
+                logger.warning(f"ADB disconnect failed for {address}: {e}")
+    
+    async def _close_adb_shell(self, container_id: str):
+        shell = self._adb_shells.pop(container_id, None)
+        if shell and shell.returncode is None:
+            shell.kill()
+            await shell.wait()
+    
+    async def _probe_all(self) -> set:
+        """Addresses of all devices ADB currently reports online, from one shared `adb devices` call"""
+        async with self._adb_probe_lock:
+            if time.monotonic() - self._adb_devices_ts >= ADB_PROBE_TTL:
+                output = await self._run_adb('devices')
+                self._adb_devices = {
+                    parts[0] for parts in (line.split() for line in output.splitlines()[1:])
+                    if len(parts) >= 2 and parts[1] == 'device'
+                }
+                self._adb_devices_ts = time.monotonic()
+            return self._adb_devices
+    
+    async def test_container_responsiveness(self, container_id: str) -> Tuple[bool, float]:
+        """Test if container is responsive via ADB"""
+        try:
+            address = self._adb_addresses.get(container_id)
+            if address is None:
+                if not await self._connect_adb(container_id):
+                    return False, 0.0
+                address = self._adb_addresses[container_id]
             
             start_time = time.time()
             
             # Test ADB connection
-            result = subprocess.run([
-                'adb', 'connect', f'localhost:{host_port}'
-            ], capture_output=True, text=True, timeout=10)
+            if address not in await self._probe_all():
+                return False, 0.0
             
-            response_time = time.time() - start_time
+            # Test basic command through the container's persistent shell
+            shell = self._adb_shells.get(container_id)
+            if shell is None or shell.returncode is not None:
+                shell = await asyncio.create_subprocess_exec(
+                    'adb', '-s', address, 'shell',
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.DEVNULL
+                )
+                self._adb_shells[container_id] = shell
+            
+            shell.stdin.write(b'echo test\n')
+            await shell.stdin.drain()
+            try:
+                line = await asyncio.wait_for(shell.stdout.readline(), timeout=5)
+            except asyncio.TimeoutError:
+                await self._close_adb_shell(container_id)
+                raise
             
-            success = 'connected' in result.stdout.lower()
+            response_time = time.time() - start_time
             
-            if success:
-                # Test basic command
-                test_result = subprocess.run([
-                    'adb', '-s', f'localhost:{host_port}', 'shell', 'echo', 'test'
-                ], capture_output=True, text=True, timeout=5)
-                success = 'test' in test_result.stdout
+            success = line.strip() == b'test'
             
             return success, response_time
             
@@ -286,7 +876,7 @@ class LoadTester:
         logger.info(f"Starting {test_name}")
         
         start_time = datetime.now()
-        self.start_monitoring()
+        self.start_monitoring(duration=duration)
         
         errors = []
         response_times = []
@@ -307,8 +897,8 @@ class LoadTester:
                 avg_response_time=0.0,
                 max_response_time=0.0,
                 min_response_time=0.0,
-                system_metrics=[],
-                container_metrics=[],
+                system_metrics={},
+                container_metrics={},
                 errors=["Failed to create container"],
                 start_time=start_time,
                 end_time=datetime.now()
@@ -336,15 +926,11 @@ class LoadTester:
                 await asyncio.sleep(5)
         
         finally:
-            # Cleanup
-            try:
-                container = self.docker_client.containers.get(container_id)
-                container.stop()
-                container.remove()
-            except:
-                pass
-            
+            # Stop monitoring first so its next cycle cannot restart readers for the container being removed
             self.stop_monitoring()
+            
+            # Cleanup
+            await self._teardown_container(container_id)
         
         # Calculate results
         success_rate = (len([r for r in response_times if r > 0]) / len(response_times)) * 100 if response_times else 0
@@ -361,8 +947,8 @@ class LoadTester:
             avg_response_time=avg_response_time,
             max_response_time=max_response_time,
             min_response_time=min_response_time,
-            system_metrics=self.system_metrics.copy(),
-            container_metrics=self.container_metrics.copy(),
+            system_metrics=self.system_metrics.snapshot(),
+            container_metrics={cid: buffer.snapshot() for cid, buffer in self.container_metrics.items()},
             errors=errors,
             start_time=start_time,
             end_time=datetime.now()
@@ -377,7 +963,7 @@ class LoadTester:
         logger.info(f"Starting {test_name}")
         
         start_time = datetime.now()
-        self.start_monitoring()
+        self.start_monitoring(duration=duration)
         
         errors = []
         response_times = []
@@ -403,8 +989,9 @@ class LoadTester:
                 raise Exception("Failed to create any containers")
             
             # Test all containers concurrently
-            async def test_container_repeatedly(container_id: str):
+            async def test_container_repeatedly(container_id: str) -> Tuple[List[float], List[str]]:
                 container_response_times = []
+                container_errors = []
                 test_end_time = time.time() + duration
                 
                 while time.time() < test_end_time:
@@ -413,36 +1000,32 @@ class LoadTester:
                         container_response_times.append(response_time)
                         
                         if not success:
-                            errors.append(f"Container {container_id[:12]} unresponsive")
+                            container_errors.append(f"Container {container_id[:12]} unresponsive")
                         
                     except Exception as e:
-                        errors.append(f"Test error for {container_id[:12]}: {e}")
+                        container_errors.append(f"Test error for {container_id[:12]}: {e}")
                     
                     await asyncio.sleep(2)
                 
-                return container_response_times
+                return container_response_times, container_errors
             
             # Run tests on all containers concurrently
             test_tasks = [test_container_repeatedly(cid) for cid in created_containers]
-            all_response_times = await asyncio.gather(*test_tasks, return_exceptions=True)
+            all_outcomes = await asyncio.gather(*test_tasks, return_exceptions=True)
             
-            # Flatten response times
-            for times in all_response_times:
-                if isinstance(times, list):
+            # Merge each task's response times and errors once
+            for outcome in all_outcomes:
+                if isinstance(outcome, tuple):
+                    times, container_errors = outcome
                     response_times.extend(times)
+                    errors.extend(container_errors)
         
         finally:
-            # Cleanup all containers
-            for container_id in created_containers:
-                try:
-                    container = self.docker_client.containers.get(container_id)
-                    container.stop()
-                    container.remove()
-                    logger.info(f"Cleaned up container {container_id[:12]}")
-                except Exception as e:
-                    logger.error(f"Failed to cleanup container {container_id[:12]}: {e}")
-            
+            # Stop monitoring first so its next cycle cannot restart readers for containers being removed
             self.stop_monitoring()
+            
+            # Cleanup all containers in parallel
+            await asyncio.gather(*[self._teardown_container(cid) for cid in created_containers])
         
         # Calculate results
         success_rate = (len([r for r in response_times if r > 0]) / len(response_times)) * 100 if response_times else 0
@@ -459,8 +1042,8 @@ class LoadTester:
             avg_response_time=avg_response_time,
             max_response_time=max_response_time,
             min_response_time=min_response_time,
-            system_metrics=self.system_metrics.copy(),
-            container_metrics=self.container_metrics.copy(),
+            system_metrics=self.system_metrics.snapshot(),
+            container_metrics={cid: buffer.snapshot() for cid, buffer in self.container_metrics.items()},
             errors=errors,
             start_time=start_time,
             end_time=datetime.now()
@@ -500,13 +1083,29 @@ class LoadTester:
             duration=duration
         )
     
-    def generate_performance_report(self) -> Dict:
-        """Generate comprehensive performance report"""
+    def save_raw_metrics(self, path: str):
+        """Write every result's metric columns, encoded and compressed, to an .npz archive
+        
+        Keys are result{index}/system/{field} and result{index}/{container_id}/{field};
+        decode a column with _decode_series and the dtype from SYSTEM_COLUMNS or CONTAINER_COLUMNS
+        """
+        arrays = {}
+        for index, result in enumerate(self.results):
+            for name, column in result.system_metrics.items():
+                arrays[f"result{index}/system/{name}"] = _encode_series(column)
+            for container_id, columns in result.container_metrics.items():
+                for name, column in columns.items():
+                    arrays[f"result{index}/{container_id}/{name}"] = _encode_series(column)
+        
+        np.savez_compressed(path, **arrays)
+    
+    def generate_performance_report(self, include_raw: bool = False) -> Dict:
+        """Generate comprehensive performance report, optionally with every raw metric sample"""
         if not self.results:
             return {"error": "No test results available"}
         
         report = {
-            "test_timestamp": datetime.now().isoformat(),
+            "test_timestamp": datetime.now(),
             "total_tests_run": len(self.results),
             "test_results": [],
             "performance_summary": {},
@@ -531,27 +1130,40 @@ class LoadTester:
             
             # System performance analysis
             if result.system_metrics:
-                cpu_values = [m.cpu_percent for m in result.system_metrics]
-                memory_values = [m.memory_percent for m in result.system_metrics]
+                avg_cpu, max_cpu, avg_memory, max_memory, peak_active = _system_summary(
+                    result.system_metrics['cpu_percent'],
+                    result.system_metrics['memory_percent'],
+                    result.system_metrics['active_containers']
+                )
                 
                 test_data["system_performance"] = {
-                    "avg_cpu_percent": statistics.mean(cpu_values),
-                    "max_cpu_percent": max(cpu_values),
-                    "avg_memory_percent": statistics.mean(memory_values),
-                    "max_memory_percent": max(memory_values),
-                    "peak_active_containers": max(m.active_containers for m in result.system_metrics)
+                    "avg_cpu_percent": float(avg_cpu),
+                    "max_cpu_percent": float(max_cpu),
+                    "avg_memory_percent": float(avg_memory),
+                    "max_memory_percent": float(max_memory),
+                    "peak_active_containers": int(peak_active)
                 }
             
             # Container performance analysis
             if result.container_metrics:
-                container_cpu_values = [m.cpu_percent for m in result.container_metrics]
-                container_memory_values = [m.memory_usage_mb for m in result.container_metrics]
+                # Pool the samples of every container in the test
+                avg_cpu, max_cpu, avg_memory, max_memory = _container_summary(
+                    np.concatenate([columns['cpu_percent'] for columns in result.container_metrics.values()]),
+                    np.concatenate([columns['memory_usage_mb'] for columns in result.container_metrics.values()])
+                )
                 
                 test_data["container_performance"] = {
-                    "avg_container_cpu_percent": statistics.mean(container_cpu_values),
-                    "max_container_cpu_percent": max(container_cpu_values),
-                    "avg_container_memory_mb": statistics.mean(container_memory_values),
-                    "max_container_memory_mb": max(container_memory_values)
+                    "avg_container_cpu_percent": float(avg_cpu),
+                    "max_container_cpu_percent": float(max_cpu),
+                    "avg_container_memory_mb": float(avg_memory),
+                    "max_container_memory_mb": float(max_memory)
+                }
+            
+            if include_raw:
+                test_data["raw_system_metrics"] = _columns_to_lists(result.system_metrics)
+                test_data["raw_container_metrics"] = {
+                    container_id: _columns_to_lists(columns)
+                    for container_id, columns in result.container_metrics.items()
                 }
             
             report["test_results"].append(test_data)
@@ -609,11 +1221,18 @@ async def main():
         # Generate and save report
         report = tester.generate_performance_report()
         
-        print(json.dumps(report, indent=2))
+        payload = orjson.dumps(
+            report,
+            option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE | orjson.OPT_SERIALIZE_NUMPY
+        )
+        sys.stdout.buffer.write(payload)
+        sys.stdout.flush()
         
-        # Save detailed report
-        with open(f"/tmp/load_test_report_{int(time.time())}.json", 'w') as f:
-            json.dump(report, f, indent=2)
+        # Save summary report, with the raw metric series alongside in compressed form
+        report_base = f"/tmp/load_test_report_{int(time.time())}"
+        with open(f"{report_base}.json", 'wb') as f:
+            f.write(payload)
+        tester.save_raw_metrics(f"{report_base}.metrics.npz")
         
         logger.info("Load testing completed successfully")
         